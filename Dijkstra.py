@@ -1,8 +1,10 @@
-import heapq
 from collections import defaultdict
 from functools import lru_cache
+from itertools import combinations
 
 #上0下1左2右3
+_DIR_NAMES = ('上', '下', '左', '右')
+
 adjacency_matrix = {
     # 列1
     'E': {'D': 1,'J': 3},  # E(1,1)只能向下到J(2,1)
@@ -29,10 +31,132 @@ adjacency_matrix = {
 }
 
 
+def _dijkstra(indptr, neighbors, weights, max_weight, source):
+    """
+    Dial桶队列Dijkstra内核，只处理整数下标
+    参数:
+        indptr, neighbors, weights: CSR格式邻接表，节点u的边为
+            neighbors[indptr[u]:indptr[u+1]]及对应的weights
+        max_weight: 最大边权
+        source: 源点下标
+    返回:
+        (各节点最短距离列表, 各节点在最短路径树上的前驱下标列表)
+    """
+    n = len(indptr) - 1
+    distances = [float('infinity')] * n
+    prev = [-1] * n
+    visited = [False] * n
+    distances[source] = 0
+    # 最短距离不超过 最大边权*(n-1)，每个距离值对应一个桶
+    buckets = [[] for _ in range(max_weight * (n - 1) + 1)]
+    buckets[0].append(source)
+    
+    for current_distance, bucket in enumerate(buckets):
+        for current_node in bucket:
+            if visited[current_node]:
+                continue
+            
+            visited[current_node] = True
+            
+            for e in range(indptr[current_node], indptr[current_node + 1]):
+                neighbor = neighbors[e]
+                distance = current_distance + weights[e]
+                
+                if distance < distances[neighbor]:
+                    distances[neighbor] = distance
+                    prev[neighbor] = current_node
+                    buckets[distance].append(neighbor)
+    
+    return (distances, prev)
+
+def _held_karp(dist, start_idx, target_idx):
+    """
+    Held-Karp动态规划内核，只处理整数下标
+    参数:
+        dist: 全源最短距离表
+        start_idx: 起始点下标
+        target_idx: 互不相同的目标点下标列表
+    返回:
+        (总距离, 目标点下标的访问顺序)
+    """
+    k = len(target_idx)
+    full = (1 << k) - 1
+    inf = float('infinity')
+    
+    # cost[mask * k + i]: 访问完mask中的目标点并停在目标点i的最短距离
+    cost = [inf] * ((full + 1) * k)
+    parent = [-1] * ((full + 1) * k)
+    start_row = dist[start_idx]
+    for i in range(k):
+        cost[(1 << i) * k + i] = start_row[target_idx[i]]
+    
+    # 最近邻贪心路线的长度作为初始上界
+    upper_bound = 0
+    current = start_idx
+    unvisited = set(target_idx)
+    while unvisited:
+        row = dist[current]
+        current = min(unvisited, key=lambda t: row[t])
+        upper_bound += row[current]
+        unvisited.remove(current)
+    
+    # 进入目标点j至少要走min_edge[j]，rest_bound[mask]为mask之外所有目标点的min_edge之和
+    min_edge = [
+        min([start_row[t]] + [dist[u][t] for u in target_idx if u != t])
+        for t in target_idx
+    ]
+    rest_bound = [0] * (full + 1)
+    for mask in range(full - 1, -1, -1):
+        lowest = ~mask & full & (mask + 1)
+        rest_bound[mask] = rest_bound[mask | lowest] + min_edge[lowest.bit_length() - 1]
+    
+    for mask in range(1, full):
+        base = mask * k
+        bound = rest_bound[mask]
+        for i in range(k):
+            current_cost = cost[base + i]
+            # 下界已超过上界的状态不可能构成最优路线，剪枝
+            if current_cost + bound > upper_bound:
+                continue
+            row = dist[target_idx[i]]
+            for j in range(k):
+                if mask & (1 << j):
+                    continue
+                next_mask = mask | (1 << j)
+                slot = next_mask * k + j
+                new_cost = current_cost + row[target_idx[j]]
+                if new_cost < cost[slot]:
+                    cost[slot] = new_cost
+                    parent[slot] = i
+                    if next_mask == full and new_cost < upper_bound:
+                        upper_bound = new_cost
+    
+    # 选取最优终点，沿parent回溯访问顺序
+    last = min(range(k), key=lambda i: cost[full * k + i])
+    total_distance = cost[full * k + last]
+    order = []
+    mask = full
+    while last != -1:
+        order.append(target_idx[last])
+        previous = parent[mask * k + last]
+        mask ^= 1 << last
+        last = previous
+    
+    return (total_distance, order[::-1])
+
+
 class GraphPathPlanner:
+    __slots__ = (
+        'graph', 'nodes', 'idx', 'adj_indptr', 'adj_neighbors', 'adj_weights',
+        'max_weight', 'dir_matrix', 'dist', 'prev'
+    )
+    
     def __init__(self):
         self.graph = defaultdict(dict)
         self._initialize_graph()
+        self._initialize_adjacency()
+        self._initialize_directions()
+        self._initialize_shortest_paths()
     
     def _initialize_graph(self):
         """初始化图结构"""
@@ -53,29 +177,51 @@ class GraphPathPlanner:
         self.graph[u][v] = weight
         self.graph[v][u] = weight
     
-    def dijkstra(self, start):
-        """Dijkstra算法计算单源最短路径"""
-        distances = {node: float('infinity') for node in self.graph}
-        distances[start] = 0
-        heap = [(0, start)]
-        visited = set()
-        
-        while heap:
-            current_distance, current_node = heapq.heappop(heap)
-            
-            if current_node in visited:
-                continue
-                
-            visited.add(current_node)
-            
-            for neighbor, weight in self.graph[current_node].items():
-                distance = current_distance + weight
-                
-                if distance < distances[neighbor]:
-                    distances[neighbor] = distance
-                    heapq.heappush(heap, (distance, neighbor))
+    def _initialize_adjacency(self):
+        """将节点名映射为整数下标，建立CSR格式的整数邻接表"""
+        self.nodes = sorted(self.graph)
+        self.idx = {node: i for i, node in enumerate(self.nodes)}
+        self.adj_indptr = [0]
+        self.adj_neighbors = []
+        self.adj_weights = []
+        for u in self.nodes:
+            for v, weight in self.graph[u].items():
+                self.adj_neighbors.append(self.idx[v])
+                self.adj_weights.append(weight)
+            self.adj_indptr.append(len(self.adj_neighbors))
+        self.max_weight = max(self.adj_weights)
+    
+    def _initialize_directions(self):
+        """由adjacency_matrix建立方向表，dir_matrix[u][v]为从u走到v的方向编号"""
+        n = len(self.nodes)
+        self.dir_matrix = [[None] * n for _ in range(n)]
+        for u, neighbors in adjacency_matrix.items():
+            for v, direction in neighbors.items():
+                self.dir_matrix[self.idx[u]][self.idx[v]] = direction
         
-        return distances
+        # 图的边和adjacency_matrix分开维护，缺少方向的边会让小车走错，必须在此报错
+        for u, neighbors in self.graph.items():
+            for v in neighbors:
+                if self.dir_matrix[self.idx[u]][self.idx[v]] is None:
+                    raise ValueError(f"adjacency_matrix中缺少边{u}->{v}的方向")
+    
+    def _initialize_shortest_paths(self):
+        """以每个节点为源点运行Dijkstra，预计算全源最短距离表和前驱表"""
+        self.dist = []
+        self.prev = []
+        for source in range(len(self.nodes)):
+            distances, prev = _dijkstra(
+                self.adj_indptr, self.adj_neighbors, self.adj_weights, self.max_weight, source
+            )
+            self.dist.append(distances)
+            self.prev.append(prev)
+    
+    def dijkstra(self, start):
+        """Dijkstra算法计算单源最短路径(边权为小正整数，使用Dial桶队列)"""
+        distances, _ = _dijkstra(
+            self.adj_indptr, self.adj_neighbors, self.adj_weights, self.max_weight, self.idx[start]
+        )
+        return {node: distances[i] for i, node in enumerate(self.nodes)}
     
     def find_optimal_path(self, start, targets):
         """
@@ -86,62 +232,36 @@ class GraphPathPlanner:
         返回:
             (总距离, 路径列表)
         """
-        if not targets:
+        # 目标点去重并映射为下标，起始点本身已在路径上，无需再访问
+        target_idx = [self.idx[target] for target in dict.fromkeys(targets) if target != start]
+        if not target_idx:
             return (0, [start])
             
-        # 计算所有目标点之间的最短距离
-        all_nodes = [start] + targets
-        distance_matrix = {}
+        # 使用Held-Karp动态规划解决旅行商问题(TSP)，回溯得到的顺序中每个点只出现一次
+        total_distance, order = _held_karp(self.dist, self.idx[start], target_idx)
         
-        for node in all_nodes:
-            distances = self.dijkstra(node)
-            distance_matrix[node] = distances
-        
-        # 使用动态规划解决旅行商问题(TSP)
-        target_set = frozenset(targets)
-        
-        @lru_cache(maxsize=None)
-        def dp(visited, current):
-            if visited == target_set:
-                return (0, [current])
-                
-            min_dist = float('infinity')
-            best_path = []
-            
-            for target in target_set - visited:
-                dist = distance_matrix[current][target]
-                remaining_dist, remaining_path = dp(visited | {target}, target)
-                total_dist = dist + remaining_dist
-                
-                if total_dist < min_dist:
-                    min_dist = total_dist
-                    best_path = [current] + remaining_path
-            
-            return (min_dist, best_path)
-        
-        total_distance, path = dp(frozenset(), start)
-        
-        # 优化路径，去除连续重复的节点
-        optimized_path = []
-        for node in path:
-            if not optimized_path or node != optimized_path[-1]:
-                optimized_path.append(node)
-        
-        return (total_distance, optimized_path)
+        return (total_distance, [start] + [self.nodes[i] for i in order])
     
-    def reconstruct_path(self, start, end, distances):
-        """重建从start到end的具体路径"""
+    def _reconstruct_segment(self, start, end):
+        """沿前驱表重建从start到end的具体路径，同时生成对应的动作序列"""
+        source = self.idx[start]
+        current = self.idx[end]
+        prev = self.prev[source]
+        dir_matrix = self.dir_matrix
         path = [end]
-        current = end
+        actions = []
         
-        while current != start:
-            for neighbor in self.graph[current]:
-                if distances[current] == distances[neighbor] + self.graph[current][neighbor]:
-                    path.append(neighbor)
-                    current = neighbor
-                    break
+        while current != source:
+            previous = prev[current]
+            actions.append(_DIR_NAMES[dir_matrix[previous][current]])
+            path.append(self.nodes[previous])
+            current = previous
         
-        return path[::-1]
+        return (path[::-1], actions[::-1])
+    
+    def reconstruct_path(self, start, end):
+        """沿前驱表重建从start到end的具体路径"""
+        return self._reconstruct_segment(start, end)[0]
     
     def plan_path(self, targets, start='A'):
         """
@@ -154,47 +274,63 @@ class GraphPathPlanner:
                 'targets': 目标点列表,
                 'optimal_path': 最优路径顺序,
                 'total_distance': 总距离,
-                'detailed_path': 详细路径
+                'detailed_path': 详细路径,
+                'action_sequence': 动作序列
             }
         """
         # 查找最优路径顺序
         total_distance, path = self.find_optimal_path(start, targets)
         
-        # 获取详细路径
-        full_path = []
+        # 获取详细路径和动作序列
+        full_path = [path[0]]
+        action_sequence = []
         for i in range(len(path)-1):
-            start_node = path[i]
-            end_node = path[i+1]
-            distances = self.dijkstra(start_node)
-            segment_path = self.reconstruct_path(start_node, end_node, distances)
-            full_path.extend(segment_path[:-1])
-        full_path.append(path[-1])
+            segment_path, segment_actions = self._reconstruct_segment(path[i], path[i+1])
+            full_path.extend(segment_path[1:])
+            action_sequence.extend(segment_actions)
         
         return {
             'targets': targets,
             'optimal_path': path,
             'total_distance': total_distance,
-            'detailed_path': full_path
+            'detailed_path': full_path,
+            'action_sequence': action_sequence
         }
 
-def get_action_sequence(path, adjacency_matrix):
-    sequence = []
-    for i in range(len(path)-1):
-        if adjacency_matrix[path[i]][path[i+1]] == 0:
-            sequence.append('上')
-        elif adjacency_matrix[path[i]][path[i+1]] == 1:
-            sequence.append('下')
-        elif adjacency_matrix[path[i]][path[i+1]] == 2:
-            sequence.append('左')
-        elif adjacency_matrix[path[i]][path[i+1]] == 3:
-            sequence.append('右')
-    return sequence
+# 图结构固定，全局共用一个规划器
+_PLANNER = GraphPathPlanner()
+
+# 预计算的规划结果，键为(排序后的目标点元组, 起始点)，值为(总距离, 最优路径顺序, 动作序列)
+# 建表需要数千次Held-Karp求解，导入时不建立，由main()在启动时调用precompute_plans()
+_PRECOMPUTED = {}
+
+def precompute_plans(start='A', max_targets=5):
+    """预计算从start出发、最多max_targets个目标点的所有规划结果"""
+    candidates = [node for node in _PLANNER.nodes if node != start]
+    for k in range(1, max_targets + 1):
+        for targets in combinations(candidates, k):
+            result = _PLANNER.plan_path(list(targets), start)
+            _PRECOMPUTED[(targets, start)] = (
+                result['total_distance'],
+                tuple(result['optimal_path']),
+                tuple(result['action_sequence'])
+            )
+
+def _plan_key(targets, start):
+    """起始点本身不需要访问；目标点去重排序，使规划结果与输入顺序无关"""
+    return (tuple(sorted(set(targets) - {start})), start)
+
+@lru_cache(maxsize=None)
+def _planned_actions(targets, start):
+    """按(目标点元组, 起始点)缓存规划得到的动作序列"""
+    result = _PLANNER.plan_path(list(targets), start)
+    return tuple(result['action_sequence'])
 
 def get_path(targets1):
-    planner = GraphPathPlanner()
-    result1 = planner.plan_path(targets1)
-    # 使用示例
-    action_sequence = get_action_sequence(result1['detailed_path'], adjacency_matrix)
-    return action_sequence
+    key = _plan_key(targets1, 'A')
+    plan = _PRECOMPUTED.get(key)
+    if plan is not None:
+        return list(plan[2])
+    return list(_planned_actions(*key))
 
     
\ No newline at end of file
@@ -1,45 +1,74 @@
-import time
+import os
+import socket
+import sys
 import Jetson.GPIO as GPIO
 
 # 引脚定义 (使用BOARD编号模式)
 output_pin = 27  # 要控制的引脚
-control_file = "electromagnet.txt"  # 控制文件路径
+control_socket = "/tmp/electromagnet.sock"  # 控制socket路径，与place.py中一致
 
+# 已有实例在监听时拒绝启动，避免删掉它的socket并抢占GPIO
+with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as probe:
+    try:
+        probe.connect(control_socket)
+        running = True
+    except (FileNotFoundError, ConnectionRefusedError):
+        running = False  # socket文件不存在，或是上次退出残留的
+if running:
+    sys.exit(f"错误: 已有electromagnet.py在监听 {control_socket}，拒绝重复启动")
+
+server = None
 try:
     # 初始化GPIO
     GPIO.setmode(GPIO.BOARD)
     GPIO.setup(output_pin, GPIO.OUT, initial=GPIO.LOW)  # 初始设为低电平
     print(f"引脚 {output_pin} 已初始化为输出模式")
 
-    print("持续监控control.txt文件...按Ctrl+C停止")
+    # 建立Unix socket，阻塞等待控制指令，不再轮询文件
+    if os.path.exists(control_socket):
+        os.unlink(control_socket)  # 清理残留的socket文件
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    server.bind(control_socket)
+    server.listen(1)
+
+    print(f"监听 {control_socket} ...按Ctrl+C停止")
     while True:
+        conn, _ = server.accept()
+        # 只有这一个进程能控制电磁铁，客户端连上却不发送时不能一直阻塞
+        # magnet()连上后立即发送指令，超时要短于它1秒的等待确认时间
+        conn.settimeout(0.2)
         try:
-            with open(control_file, "r") as f:
-                content = f.read().strip()  # 读取文件内容并去除首尾空格
-            
-            # 根据文件内容设置GPIO状态
-            if content == "1":
-                GPIO.output(output_pin, GPIO.HIGH)
-                print("检测到1 - GPIO设置为HIGH", end="\r")  # \r覆盖上一行输出
-            elif content == "0":
-                GPIO.output(output_pin, GPIO.LOW)
-                print("检测到0 - GPIO设置为LOW ", end="\r")
-            else:
-                print(f"忽略无效内容: '{content}' (期望0或1)", end="\r")
-
-            time.sleep(0.1)  # 降低CPU占用，适当调整检测频率
+            with conn:
+                content = conn.recv(1).decode().strip()
+
+                # 根据指令设置GPIO状态，设置完成后回传同一字节作为确认
+                if content == "1":
+                    GPIO.output(output_pin, GPIO.HIGH)
+                    conn.sendall(b"1")
+                    print("检测到1 - GPIO设置为HIGH", end="\r")  # \r覆盖上一行输出
+                elif content == "0":
+                    GPIO.output(output_pin, GPIO.LOW)
+                    conn.sendall(b"0")
+                    print("检测到0 - GPIO设置为LOW ", end="\r")
+                elif content == "":
+                    pass  # 启动检查的探测连接，不带指令
+                else:
+                    print(f"忽略无效内容: '{content}' (期望0或1)", end="\r")
 
-        except FileNotFoundError:
-            print(f"错误: 文件 {control_file} 不存在，等待重试...", end="\r")
-            time.sleep(1)  # 文件不存在时等待1秒再重试
         except Exception as e:
-            print(f"读取文件出错: {str(e)}", end="\r")
-            time.sleep(0.5)
+            print(f"处理控制指令出错: {str(e)}", end="\r")
 
 except KeyboardInterrupt:
     print("\n用户中断")
 finally:
-    # 清理GPIO
+    # 先清理GPIO，保证即使socket清理出错也能复位
     GPIO.output(output_pin, GPIO.LOW)  # 确保最后是低电平
     GPIO.cleanup()
-    print("GPIO已复位，所有引脚恢复默认状态")
\ No newline at end of file
+    print("GPIO已复位，所有引脚恢复默认状态")
+    # 关闭socket
+    if server is not None:
+        server.close()
+        try:
+            os.unlink(control_socket)
+        except FileNotFoundError:
+            pass
\ No newline at end of file
@@ -8,10 +8,16 @@ from place import *
 from Dijkstra import * 
 import time
 
+# magnet()的确认只说明GPIO已切换，吸合/释放零件还需要等待的时间(秒)
+# 沿用改为socket通信前的5秒，尚未在实机上测量
+magnet_settle_time = 5
+
 def voice(content):
     return None
 
 def main():
+    # 启动时预计算常用的路径规划结果，之后get_path直接查表
+    precompute_plans()
     #这一步是获取前端信息，获取mode等信息，如果是放置，要获取货物的编号信息，如果是路径规划，要获取目的地位置数组
     info = {'mode':'place','code':'A'}
     if info['mode'] == 'place':
@@ -21,13 +27,17 @@ def main():
         if flag1 and flag2:
             #voice('检测没有问题')
             time.sleep(1)
-            magnet(1)
-            time.sleep(5)
+            if not magnet(1):
+                print("电磁铁未吸合，停止放置")
+                return
+            time.sleep(magnet_settle_time)
             action_sequence = get_path(['A',info['code']])
             move(action_sequence)
             rail(1)#直接用
-            magnet(0)
-            time.sleep(5)
+            if not magnet(0):
+                print("电磁铁未释放，停止放置")
+                return
+            time.sleep(magnet_settle_time)
             rail(0)
             action_sequence = get_path([info['code'],'A'])
             move(action_sequence)
@@ -1,6 +1,9 @@
 from ultralytics import YOLO
 import cv2
-from collections import defaultdict
+import numpy as np
+import atexit
+import os
+import socket
 import time
 
 class_names = {
@@ -19,21 +22,40 @@ class_names = {
     12: "T-shaped screw"
 }
 
-# 初始化YOLO模型
+# 各模式对应的模型文件名(不含扩展名)
+model_files = {
+    'classification': 'best_classification',  # 你的自定义模型
+    'defect_detect': 'best_defect'
+}
+
+# 每轮检测采集的帧数，这些帧作为一个batch送入YOLO
+detect_frames = 5
+
+# 已加载的模型，避免每次检测都重新读取权重
+_MODELS = {}
+
+# 在Jetson上离线执行一次，将.pt权重导出为TensorRT FP16引擎
+# TensorRT引擎的输入batch是固定的，必须与capture_and_process每次送入的帧数一致
+def export_engine(choice):
+    return YOLO(model_files[choice] + '.pt').export(
+        format='engine', half=True, device=0, batch=detect_frames
+    )
+
+# 初始化YOLO模型，优先加载TensorRT引擎，引擎不存在时回退到.pt权重
 def init_yolo(choice):
-    if choice == 'classification':
-        return YOLO('best_classification.pt')  # 加载你的自定义模型
-    elif choice == 'defect_detect':
-        return YOLO('best_defect.pt')
+    if choice not in _MODELS:
+        engine_file = model_files[choice] + '.engine'
+        if os.path.exists(engine_file):
+            _MODELS[choice] = YOLO(engine_file)
+        else:
+            _MODELS[choice] = YOLO(model_files[choice] + '.pt')
+    return _MODELS[choice]
 
-# 将YOLO结果转换为detections结构
+# 将一批YOLO结果展平为(类别编号数组, 置信度数组)
 def process_yolo_results(results):
-    detections = []
-    for result in results:
-        for cls, conf in zip(result.boxes.cls, result.boxes.conf):
-            class_name = result.names[int(cls)]  # 获取类别名称
-            detections.append((class_name, float(conf)))  # 转换为需要的格式
-    return detections
+    class_ids = np.concatenate([result.boxes.cls.cpu().numpy() for result in results])
+    confidences = np.concatenate([result.boxes.conf.cpu().numpy() for result in results])
+    return class_ids.astype(np.int64), confidences
 
 def gstreamer_pipeline(
     sensor_id=0,
@@ -62,14 +84,28 @@ def gstreamer_pipeline(
         )
     )
 
+# 摄像头只打开一次，在多次检测之间复用
+_CAP = None
+
+def get_capture():
+    global _CAP
+    if _CAP is None or not _CAP.isOpened():
+        # 设置GStreamer管道
+        _CAP = cv2.VideoCapture(gstreamer_pipeline(flip_method=0), cv2.CAP_GSTREAMER)
+    return _CAP
+
+# 进程退出时释放摄像头
+@atexit.register
+def release_capture():
+    if _CAP is not None:
+        _CAP.release()
+
 def capture_and_process(choice,code=0):
     yolo_model = init_yolo(choice)
-    detection_history = defaultdict(list)
+    frames = []
     start_time = time.time()
-    detection_count = 0
     
-    # 设置GStreamer管道
-    cap = cv2.VideoCapture(gstreamer_pipeline(flip_method=0), cv2.CAP_GSTREAMER)
+    cap = get_capture()
     
     if not cap.isOpened():
         print("Error: Unable to open camera")
@@ -82,44 +118,41 @@ def capture_and_process(choice,code=0):
             break
         
         current_time = time.time()
-        if current_time - start_time >= 0.5 and detection_count < 5:
-            # 进行YOLO检测
+        if current_time - start_time >= 0.5 and len(frames) < detect_frames:
+            frames.append(frame)
+            start_time = current_time
+            print(f"Frame #{len(frames)} captured")
+        
+        if len(frames) == detect_frames:
+            # 采集的帧一起送入YOLO批量检测
             #置信度需要微调
             results = yolo_model.predict(
-                source=frame,
+                source=frames,
                 conf=0.5,
                 save=False,
                 show=False
             )
             
-            # 转换为标准格式
-            detections = process_yolo_results(results)
-            
-            # 记录检测结果
-            for class_name, confidence in detections:
-                detection_history[class_name].append(confidence)
+            # 按类别统计出现次数和置信度之和
+            class_ids, confidences = process_yolo_results(results)
+            names = results[0].names
+            counts = np.bincount(class_ids, minlength=len(names))
+            confidence_sums = np.bincount(class_ids, weights=confidences, minlength=len(names))
             
-            detection_count += 1
-            start_time = current_time
-            print(f"Detection #{detection_count} completed")
-        
-        if detection_count == 5:
             print("\nFinal Results:")
             results = []
-            for class_name, confidences in detection_history.items():
-                count = len(confidences)
-                if count >= 4:
-                    avg_confidence = sum(confidences) / count
-                    results.append((class_name, count, avg_confidence))
+            for class_id in np.flatnonzero(counts >= 4):
+                count = int(counts[class_id])
+                avg_confidence = confidence_sums[class_id] / count
+                results.append((names[int(class_id)], count, avg_confidence))
             
             results.sort(key=lambda x: x[1], reverse=True)
             
             for class_name, count, avg_confidence in results:
                 print(f"{class_name}: appeared {count} times, average confidence {avg_confidence:.2f}")
             
-            # 重置计数器
-            detection_count = 0
-            detection_history = defaultdict(list)
+            # 重置
+            frames = []
             start_time = time.time()
     if choice == 'classification':
         if class_name == "Hexagon pillar" or class_name == "Hexagonal steel column":
@@ -134,25 +167,51 @@ def capture_and_process(choice,code=0):
         if class_name == 'product_defect':
             return False
 
+control_socket = "/tmp/electromagnet.sock"  # electromagnet.py监听的控制socket
+
+def send_magnet_signal(condition):
+    """
+    通过Unix socket将condition发送给electromagnet.py，并等待GPIO设置完成的确认
+    :param condition: 控制信号（1或0）
+    """
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(1)
+        sock.connect(control_socket)
+        sock.sendall(str(condition).encode())
+        # electromagnet.py设置好GPIO后回传同一字节
+        if sock.recv(1) != str(condition).encode():
+            raise OSError("未收到electromagnet确认")
+
 def magnet(condition):
     """
-    根据condition的值写入electromagnet.txt文件
+    控制电磁铁，electromagnet.py尚未启动时按指数退避重试
     :param condition: 控制信号（1或0）
+    :return: 收到electromagnet.py的确认返回True，否则返回False
     """
     try:
         # 检查输入是否合法
         if condition not in (0, 1):
             raise ValueError("condition必须是0或1")
         
-        # 写入文件（覆盖模式）
-        with open('electromagnet.txt', 'w') as f:
-            f.write(str(condition))
+        delay = 0.1
+        while True:
+            try:
+                send_magnet_signal(condition)
+                break
+            except (FileNotFoundError, ConnectionRefusedError):
+                if delay > 1.6:
+                    raise
+                print(f"electromagnet.py未就绪，{delay:.1f}秒后重试...")
+                time.sleep(delay)
+                delay *= 2
         print(f"已写入: electromagnet = {condition}")
+        return True
     
     except ValueError as e:
         print(f"参数错误: {e}")
-    except IOError as e:
-        print(f"文件写入失败: {e}")
+    except OSError as e:
+        print(f"控制信号发送失败: {e}")
+    return False
     
 def move(action_sequence):
     #等jetson nano的代码